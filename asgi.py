@@ -0,0 +1,230 @@
+"""
+ASGI adapter for the Flask app.
+
+Every request is handed to the WSGI app on a worker thread so the event loop
+never blocks on database access or ReportLab rendering. Slow routes (PDF
+exports, reports) get their own bounded pool and a per-route concurrency
+limit, so a burst of exports queues up (or is rejected with 503) instead of
+starving short requests like the dashboard and login.
+"""
+
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Route prefix -> maximum number of requests running at once
+DEFAULT_ROUTE_LIMITS = {
+    "/export/": 2,
+    "/reports": 4,
+}
+
+
+class RouteLimit:
+    """Concurrency limit with a bounded wait queue for one route prefix."""
+
+    def __init__(self, prefix, limit, max_waiting, wait_timeout):
+        self.prefix = prefix
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = None
+
+    @property
+    def semaphore(self):
+        # Created lazily so it binds to the server's running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def acquire(self):
+        """Wait for a slot; returns False when the request should be shed."""
+        if self.semaphore.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            return False
+        self.waiting += 1
+        try:
+            # Not asyncio.wait_for: before 3.12 it can time out just as the
+            # acquire succeeds, leaking the permit for good.
+            acquire = asyncio.ensure_future(self.semaphore.acquire())
+            done, _ = await asyncio.wait({acquire}, timeout=self.wait_timeout)
+            if acquire not in done:
+                acquire.cancel()
+                try:
+                    await acquire
+                except asyncio.CancelledError:
+                    self.rejected += 1
+                    return False
+            # Acquired (possibly just as the timeout fired); we own the permit
+            return True
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        self.semaphore.release()
+
+
+class AsgiApp:
+    """Runs a WSGI app under an ASGI server using bounded thread pools."""
+
+    def __init__(self, wsgi_app, route_limits=None, worker_threads=8,
+                 max_waiting=8, wait_timeout=30.0):
+        self.wsgi_app = wsgi_app
+        route_limits = route_limits or DEFAULT_ROUTE_LIMITS
+        self.limits = [
+            RouteLimit(prefix, limit, max_waiting, wait_timeout)
+            for prefix, limit in sorted(route_limits.items(), key=lambda item: -len(item[0]))
+        ]
+        # Heavy routes never borrow threads from the pool serving short requests
+        self.heavy_pool = ThreadPoolExecutor(
+            max_workers=sum(limit.limit for limit in self.limits),
+            thread_name_prefix="asgi-heavy",
+        )
+        self.light_pool = ThreadPoolExecutor(
+            max_workers=worker_threads,
+            thread_name_prefix="asgi-light",
+        )
+
+    def limit_for(self, path):
+        for limit in self.limits:
+            if path.startswith(limit.prefix):
+                return limit
+        return None
+
+    def shutdown(self):
+        self.heavy_pool.shutdown(wait=True)
+        self.light_pool.shutdown(wait=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = await self._read_body(receive)
+        if body is None:
+            return  # client went away; nobody to answer
+        limit = self.limit_for(scope["path"])
+
+        if limit is None:
+            await self._run(self.light_pool, scope, body, send)
+            return
+
+        if not await limit.acquire():
+            await self._send_busy(send)
+            return
+        try:
+            await self._run(self.heavy_pool, scope, body, send)
+        finally:
+            limit.release()
+
+    async def _read_body(self, receive):
+        """The full request body, or None if the client disconnected first."""
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+
+    async def _run(self, pool, scope, body, send):
+        loop = asyncio.get_running_loop()
+        environ = build_environ(scope, body)
+        status, headers, payload = await loop.run_in_executor(
+            pool, call_wsgi, self.wsgi_app, environ
+        )
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": headers,
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+    async def _send_busy(self, send):
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"retry-after", b"5"),
+            ],
+        })
+        await send({
+            "type": "http.response.body",
+            "body": b"Server is busy generating other exports, please retry shortly",
+        })
+
+
+def build_environ(scope, body):
+    """Translate an ASGI HTTP scope into a WSGI environ dict."""
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("ascii"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin1").upper().replace("-", "_")
+        value = raw_value.decode("latin1")
+        if name == "CONTENT_TYPE":
+            key = "CONTENT_TYPE"
+        elif name == "CONTENT_LENGTH":
+            key = "CONTENT_LENGTH"
+        else:
+            key = f"HTTP_{name}"
+        if key in environ:
+            value = f"{environ[key]},{value}"
+        environ[key] = value
+    return environ
+
+
+def call_wsgi(wsgi_app, environ):
+    """Run a WSGI app to completion and return (status, headers, body)."""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = [
+            (name.lower().encode("latin1"), value.encode("latin1"))
+            for name, value in headers
+        ]
+
+    result = wsgi_app(environ, start_response)
+    try:
+        body = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return response["status"], response["headers"], body
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Mixed-workload latency benchmark: sync WSGI workers vs the ASGI adapter.
+
+Runs the real app (create_app().wsgi_app) against a database filled by
+seed.py and fires a burst of /export/reports PDF exports alongside
+/dashboard requests, as a logged-in admin. Reports dashboard latency under
+both deployment modes:
+
+  * WSGI  - a fixed pool of sync workers serving requests first come, first served
+  * ASGI  - app.asgi.AsgiApp with exports limited to their own bounded pool
+
+Without --database a temporary SQLite database is seeded first; an existing
+database that already has books is used as it is.
+
+Usage: python benchmarks/bench_asgi.py [--exports 20] [--dashboards 200]
+                                       [--history 100000] [--database sqlite:///...]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app import create_app
+from app.asgi import AsgiApp, build_environ, call_wsgi
+from app.models import Book
+from app.seed import Seeder, min_books, tune_sqlite
+
+
+def make_scope(path, cookie, method="GET", headers=()):
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"cookie", cookie), *headers],
+        "server": ("localhost", 8000),
+        "client": ("127.0.0.1", 5000),
+    }
+
+
+def seed(app, args):
+    with app.app_context():
+        if Book.query.first():
+            return
+        tune_sqlite()
+        books = max(args.books, min_books(args.history, args.years))
+        started = time.perf_counter()
+        counts = Seeder(args.seed, 1, args.members, books, args.history,
+                        args.years, now=datetime(2026, 1, 1)).run()
+        print(f"Seeded {counts['book']} books, {counts['history']} History rows, "
+              f"{counts['fine']} fines in {time.perf_counter() - started:.1f}s")
+
+
+def login(wsgi_app):
+    """Log in as the default admin; returns the session cookie header value."""
+    body = urlencode({"username": "admin", "password": "admin123"}).encode()
+    scope = make_scope("/login", b"", method="POST", headers=[
+        (b"content-type", b"application/x-www-form-urlencoded"),
+        (b"content-length", str(len(body)).encode()),
+    ])
+    status, headers, _ = call_wsgi(wsgi_app, build_environ(scope, body))
+    cookie = next(value for name, value in headers if name == b"set-cookie")
+    return cookie.split(b";", 1)[0]
+
+
+def workload(exports, dashboards):
+    """Exports arrive first, then dashboards trickle in behind them."""
+    paths = ["/export/reports"] * exports + ["/dashboard"] * dashboards
+    return paths
+
+
+def service_times(wsgi_app, cookie):
+    """Time one of each request on its own, for context."""
+    for path in ("/export/reports", "/dashboard"):
+        started = time.perf_counter()
+        status, _, body = call_wsgi(wsgi_app, build_environ(make_scope(path, cookie), b""))
+        assert status == 200, (path, status)
+        print(f"{path:<16} {(time.perf_counter() - started) * 1000:8.1f} ms alone ({len(body)} bytes)")
+
+
+def summarize(label, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<6} dashboard p50={statistics.median(latencies) * 1000:8.1f} ms  "
+          f"p95={p95 * 1000:8.1f} ms  max={latencies[-1] * 1000:8.1f} ms")
+
+
+def bench_wsgi(wsgi_app, cookie, paths, workers):
+    dashboard_latencies = []
+
+    def handle(path, queued_at):
+        status, _, _ = call_wsgi(wsgi_app, build_environ(make_scope(path, cookie), b""))
+        assert status == 200, (path, status)
+        if path == "/dashboard":
+            dashboard_latencies.append(time.perf_counter() - queued_at)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(handle, path, time.perf_counter()) for path in paths]
+    for future in futures:
+        future.result()
+    return dashboard_latencies
+
+
+async def bench_asgi(wsgi_app, cookie, paths, workers):
+    app = AsgiApp(wsgi_app, route_limits={"/export/": 2},
+                  worker_threads=workers, max_waiting=len(paths), wait_timeout=600)
+    dashboard_latencies = []
+
+    async def handle(path):
+        started = time.perf_counter()
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await app(make_scope(path, cookie), receive, send)
+        assert sent[0]["status"] == 200, (path, sent[0]["status"])
+        if path == "/dashboard":
+            dashboard_latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(handle(path) for path in paths))
+    app.shutdown()
+    return dashboard_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--exports", type=int, default=20)
+    parser.add_argument("--dashboards", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--database", help="SQLAlchemy URI; seeded if it has no books")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--history", type=int, default=100000)
+    parser.add_argument("--years", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': args.database or f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        'RATELIMIT_ENABLED': False,
+        'HISTORY_JOURNAL_DIR': os.path.join(tmp, "journal"),
+    })
+    seed(app, args)
+    cookie = login(app.wsgi_app)
+
+    paths = workload(args.exports, args.dashboards)
+    print(f"{args.exports} exports + {args.dashboards} dashboards, {args.workers} workers")
+    service_times(app.wsgi_app, cookie)
+    print()
+    summarize("WSGI", bench_wsgi(app.wsgi_app, cookie, paths, args.workers))
+    summarize("ASGI", asyncio.run(bench_asgi(app.wsgi_app, cookie, paths, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+History write throughput: per-row commits vs the write-behind writer.
+
+Both modes write the same events into a throwaway SQLite database:
+
+  * per-row  - db.session.add(History(...)) + commit for every event
+  * batched  - app.history_writer.HistoryWriter.record(), timed until the
+               background thread has flushed everything
+
+Usage: python benchmarks/bench_history_writer.py [--events 20000] [--database sqlite:///...]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app import create_app
+from app.models import db, Book, Member, History
+from app.history_writer import history_writer
+
+
+def make_app(database):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database,
+        'HISTORY_JOURNAL_DIR': tempfile.mkdtemp(),
+    })
+    with app.app_context():
+        History.query.delete()
+        if not db.session.get(Member, 1):
+            db.session.add(Member(id=1, name="Bench Member"))
+        if not db.session.get(Book, 1):
+            db.session.add(Book(id=1, title="Bench Book"))
+        db.session.commit()
+    return app
+
+
+def bench_per_row(app, events):
+    with app.app_context():
+        started = time.perf_counter()
+        for i in range(events):
+            db.session.add(History(member_id=1, book_id=1, action="borrow" if i % 2 else "return"))
+            db.session.commit()
+        return time.perf_counter() - started
+
+
+def bench_batched(app, events):
+    with app.app_context():
+        started = time.perf_counter()
+        for i in range(events):
+            history_writer.record(1, 1, "borrow" if i % 2 else "return")
+        enqueued = time.perf_counter() - started
+        history_writer.close()
+        flushed = time.perf_counter() - started
+        assert History.query.count() == events
+        return enqueued, flushed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--database", default=None, help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+    database = args.database or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    elapsed = bench_per_row(make_app(database), args.events)
+    print(f"per-row  {args.events / elapsed:>10,.0f} events/s")
+
+    enqueued, flushed = bench_batched(make_app(database), args.events)
+    print(f"batched  {args.events / flushed:>10,.0f} events/s  "
+          f"(request path: {enqueued / args.events * 1e6:.1f} us/event)")
+
+
+if __name__ == "__main__":
+    main()
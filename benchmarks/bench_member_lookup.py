@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Member lookup benchmark: fuzzy trigram index and the /members/lookup prefix path.
+
+Builds a trigram index over synthetic members and times searches for
+misspelt names (one character replaced), reporting p50/p95 latency and
+how often the intended member is in the results. With --database, the same
+members (a tenth of them with an unpaid fine) are also loaded into that
+database and GET /members/lookup is timed for id, name, email and phone
+prefixes.
+
+Usage: python benchmarks/bench_member_lookup.py [--members 1000000] [--queries 500]
+                                                [--database sqlite:///...]
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.member_index import MemberIndex
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    return p50, p95
+
+
+def random_word(rng, low, high):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high))).title()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", help="also time /members/lookup against this database")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    first_names = [random_word(rng, 3, 8) for _ in range(2000)]
+    last_names = [random_word(rng, 4, 10) for _ in range(5000)]
+
+    index = MemberIndex()
+    names = []
+    started = time.perf_counter()
+    for member_id in range(1, args.members + 1):
+        name = f"{rng.choice(first_names)} {rng.choice(last_names)}"
+        names.append(name)
+        index.add(member_id, name, f"member{member_id}@library.example")
+    print(f"Indexed {args.members} members in {time.perf_counter() - started:.1f}s")
+
+    latencies = []
+    found = 0
+    for _ in range(args.queries):
+        member_id = rng.randint(1, args.members)
+        name = list(names[member_id - 1].lower())
+        name[rng.randrange(len(name))] = rng.choice(string.ascii_lowercase)
+        query = "".join(name)
+
+        started = time.perf_counter()
+        results = index.search(query)
+        latencies.append(time.perf_counter() - started)
+        found += any(names[result - 1] == names[member_id - 1] for result in results)
+
+    p50, p95 = percentiles(latencies)
+    print(f"fuzzy:  p50={p50:.2f} ms  p95={p95:.2f} ms  recall={found / args.queries:.1%}")
+
+    if args.database:
+        bench_prefix(args.database, names, args.queries, rng)
+
+
+def bench_prefix(database, names, queries, rng):
+    from app import create_app
+    from app.models import db, Member, Fine
+
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database,
+        'RATELIMIT_ENABLED': False,
+        'HISTORY_JOURNAL_DIR': tempfile.mkdtemp(),
+    })
+    with app.app_context():
+        Fine.query.delete()
+        Member.query.delete()
+        started = time.perf_counter()
+        for first in range(0, len(names), 50000):
+            db.session.execute(Member.__table__.insert(), [{
+                "id": member_id,
+                "name": names[member_id - 1],
+                "email": f"member{member_id}@library.example",
+                "phone": f"555{member_id:07d}",
+            } for member_id in range(first + 1, min(first + 50000, len(names)) + 1)])
+            db.session.execute(Fine.__table__.insert(), [
+                {"member_id": member_id, "amount": 2.5, "paid": False}
+                for member_id in range(first + 10, min(first + 50000, len(names)) + 1, 10)
+            ])
+        db.session.commit()
+        print(f"Loaded {len(names)} members into {db.engine.url.get_backend_name()} "
+              f"in {time.perf_counter() - started:.1f}s")
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    kinds = {
+        "id": lambda member_id: str(member_id),
+        "name": lambda member_id: names[member_id - 1][:rng.randint(1, 6)],
+        "email": lambda member_id: f"member{member_id}"[:rng.randint(7, 12)],
+        "phone": lambda member_id: f"555{member_id:07d}"[:rng.randint(4, 8)],
+    }
+    for kind, make_query in kinds.items():
+        latencies = []
+        for _ in range(queries):
+            query = make_query(rng.randint(1, len(names)))
+            started = time.perf_counter()
+            response = client.get('/members/lookup', query_string={'q': query})
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+        p50, p95 = percentiles(latencies)
+        print(f"prefix/{kind}:  p50={p50:.2f} ms  p95={p95:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
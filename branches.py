@@ -0,0 +1,162 @@
+"""
+Branch-aware database routing.
+
+Each library branch keeps its circulation data (Member, Book, Fine, Payment,
+History) in its own database; staff accounts (User) stay in the default
+database. Configure extra branches with
+
+    LIBRARY_BRANCHES = {"north": "mysql+mysqlconnector://.../pld_lab_north"}
+
+The default database serves LIBRARY_DEFAULT_BRANCH ("main"). A request's
+branch comes from ?branch=<name> (remembered in the session) or the
+X-Branch header, and BranchSession sends queries to that branch's engine.
+fan_out() runs a function once per branch in parallel for aggregate reports.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.util import find_tables
+
+# Tables shared by every branch; everything else is per-branch
+CENTRAL_TABLES = {"user"}
+
+
+def bind_key(branch):
+    return f"branch:{branch}"
+
+
+def default_branch():
+    return current_app.config.get("LIBRARY_DEFAULT_BRANCH", "main")
+
+
+def branch_names():
+    return [default_branch(), *current_app.config.get("LIBRARY_BRANCHES", {})]
+
+
+def current_branch():
+    if has_app_context():
+        return g.get("branch") or default_branch()
+    return None
+
+
+class BranchSession(Session):
+    """Session that routes per-branch tables to the active branch's engine."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            branch = current_branch()
+            if branch != default_branch() and not _is_central(mapper, clause):
+                return self._db.engines[bind_key(branch)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_central(mapper, clause):
+    if mapper is not None:
+        from sqlalchemy import inspect
+        return inspect(mapper).local_table.name in CENTRAL_TABLES
+    if clause is not None:
+        tables = {table.name for table in find_tables(clause, include_crud=True)
+                  if hasattr(table, "name")}
+        return bool(tables) and tables <= CENTRAL_TABLES
+    return False
+
+
+def init_app(app, db):
+    """Register branch engines, create branch tables and pick the branch per request."""
+    app.config.setdefault("LIBRARY_BRANCHES", {})
+    app.config.setdefault("LIBRARY_DEFAULT_BRANCH", "main")
+    app.config.setdefault("LIBRARY_FANOUT_WORKERS", 8)
+    binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+    for name, uri in app.config["LIBRARY_BRANCHES"].items():
+        binds[bind_key(name)] = uri
+
+    @app.before_request
+    def select_branch():
+        names = branch_names()
+        requested = request.args.get("branch") or request.headers.get("X-Branch")
+        if requested in names:
+            session["branch"] = requested
+        branch = session.get("branch")
+        g.branch = branch if branch in names else default_branch()
+
+    @app.context_processor
+    def inject_branches():
+        return {"current_branch": current_branch(), "branches": branch_names()}
+
+
+def create_branch_tables(db):
+    """Create the per-branch tables in every extra branch database."""
+    tables = [table for name, table in db.metadata.tables.items() if name not in CENTRAL_TABLES]
+    for name in current_app.config["LIBRARY_BRANCHES"]:
+        db.metadata.create_all(bind=db.engines[bind_key(name)], tables=tables)
+
+
+# ---------- Cross-branch fan-out ----------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=current_app.config["LIBRARY_FANOUT_WORKERS"],
+                thread_name_prefix="branch-fanout",
+            )
+        return _pool
+
+
+def run_in_branch(app, branch, fn, *args, profile_record=None):
+    """Call fn inside a fresh app context bound to branch.
+
+    profile_record, when the calling request is being profiled, collects
+    the SQL this call issues too.
+    """
+    from app import db
+
+    with app.app_context():
+        g.branch = branch
+        if profile_record is not None:
+            g.profile_record = profile_record
+        try:
+            return fn(*args)
+        finally:
+            db.session.remove()
+
+
+def fan_out(fn, *args):
+    """Run fn(*args) once per branch in parallel; returns {branch: result}."""
+    names = branch_names()
+    if len(names) == 1:
+        return {names[0]: fn(*args)}
+    app = current_app._get_current_object()
+    record = g.get("profile_record")
+    futures = {
+        name: _executor().submit(run_in_branch, app, name, fn, *args, profile_record=record)
+        for name in names
+    }
+    return {name: future.result() for name, future in futures.items()}
+
+
+class PerBranch:
+    """One instance of an in-memory structure per branch, chosen by the current branch."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def current(self):
+        branch = current_branch()
+        instance = self._instances.get(branch)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.setdefault(branch, self._factory())
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self.current(), name)
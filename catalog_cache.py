@@ -0,0 +1,195 @@
+"""
+Per-worker in-memory catalog cache for availability lookups.
+
+Keeps only what the circulation desk needs (id, isbn, title, author,
+available) in flat column storage instead of Book ORM objects, with hash
+indexes on id and ISBN. Refreshes are incremental: only books whose
+updated_at moved since the last sync are fetched. A full reload runs every
+FULL_RELOAD_SECONDS to pick up deleted books.
+"""
+
+import threading
+import time
+from array import array
+from datetime import timedelta
+
+from app.models import db, Book
+from app.branches import PerBranch
+
+REFRESH_SECONDS = 5
+FULL_RELOAD_SECONDS = 600
+# Incremental syncs re-read this far behind the newest updated_at seen, so a
+# transaction that stamped a row earlier but committed later is still picked up
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class CatalogEntry:
+    """Lightweight read-only view of one cached book."""
+
+    __slots__ = ("id", "isbn", "title", "author", "available")
+
+    def __init__(self, id, isbn, title, author, available):
+        self.id = id
+        self.isbn = isbn
+        self.title = title
+        self.author = author
+        self.available = available
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "isbn": self.isbn,
+            "title": self.title,
+            "author": self.author,
+            "available": self.available,
+        }
+
+
+class CatalogColumns:
+    """One generation of cached columns and indexes.
+
+    Rows are appended to every column before being published through the
+    indexes and `size`, so readers never see a half-written row.
+    """
+
+    __slots__ = ("ids", "available", "isbns", "titles", "authors",
+                 "row_by_id", "row_by_isbn", "size")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.available = bytearray()
+        self.isbns = []
+        self.titles = []
+        self.authors = []
+        self.row_by_id = {}
+        self.row_by_isbn = {}
+        self.size = 0
+
+    def upsert(self, book_id, isbn, title, author, available):
+        row = self.row_by_id.get(book_id)
+        if row is None:
+            row = len(self.ids)
+            self.ids.append(book_id)
+            self.available.append(1 if available else 0)
+            self.isbns.append(isbn)
+            self.titles.append(title)
+            self.authors.append(author)
+            self.row_by_id[book_id] = row
+            self.size = row + 1
+        else:
+            old_isbn = self.isbns[row]
+            if old_isbn != isbn and self.row_by_isbn.get(old_isbn) == row:
+                del self.row_by_isbn[old_isbn]
+            self.available[row] = 1 if available else 0
+            self.isbns[row] = isbn
+            self.titles[row] = title
+            self.authors[row] = author
+        if isbn:
+            self.row_by_isbn[isbn] = row
+
+    def entry(self, row):
+        return CatalogEntry(
+            self.ids[row],
+            self.isbns[row],
+            self.titles[row],
+            self.authors[row],
+            bool(self.available[row]),
+        )
+
+
+class CatalogCache:
+    """Column-oriented book cache with id and ISBN indexes.
+
+    Lookups never take the lock: a full reload builds a new CatalogColumns
+    and swaps it in with one assignment, so readers keep using the previous
+    generation until the new one is complete.
+    """
+
+    def __init__(self, refresh_seconds=REFRESH_SECONDS,
+                 full_reload_seconds=FULL_RELOAD_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self._lock = threading.Lock()
+        self._columns = None
+        self._synced_until = None
+        self._last_check = 0.0
+        self._last_full_reload = 0.0
+
+    def __len__(self):
+        return self._columns.size if self._columns else 0
+
+    # ---------- Loading ----------
+    def refresh(self, full=False, blocking=True):
+        """Pull books changed since the last sync (or everything if full)."""
+        if not self._lock.acquire(blocking=blocking):
+            return  # another thread is already refreshing
+        try:
+            now = time.monotonic()
+            full = full or self._columns is None \
+                or now - self._last_full_reload >= self.full_reload_seconds
+            columns = CatalogColumns() if full else self._columns
+            synced_until = None if full else self._synced_until
+
+            query = db.session.query(
+                Book.id, Book.isbn, Book.title, Book.author, Book.available, Book.updated_at
+            )
+            if synced_until is not None:
+                query = query.filter(Book.updated_at >= synced_until - SYNC_OVERLAP)
+
+            for book_id, isbn, title, author, available, updated_at in query:
+                columns.upsert(book_id, isbn, title, author, available)
+                if updated_at and (synced_until is None or updated_at > synced_until):
+                    synced_until = updated_at
+
+            self._columns = columns
+            self._synced_until = synced_until
+            if full:
+                self._last_full_reload = now
+            self._last_check = now
+        finally:
+            self._lock.release()
+
+    def ensure_fresh(self):
+        if self._columns is None:
+            # Nothing to serve yet: wait for the first load
+            self.refresh()
+        elif time.monotonic() - self._last_check >= self.refresh_seconds:
+            # Keep serving the current generation while someone else refreshes
+            self.refresh(blocking=False)
+
+    # ---------- Lookups ----------
+    def get(self, book_id):
+        self.ensure_fresh()
+        columns = self._columns
+        row = columns.row_by_id.get(book_id)
+        return None if row is None else columns.entry(row)
+
+    def get_by_isbn(self, isbn):
+        self.ensure_fresh()
+        columns = self._columns
+        row = columns.row_by_isbn.get(isbn)
+        return None if row is None else columns.entry(row)
+
+    def is_available(self, isbn):
+        """Availability by ISBN; None if the ISBN isn't in the catalog."""
+        self.ensure_fresh()
+        columns = self._columns
+        row = columns.row_by_isbn.get(isbn)
+        return None if row is None else bool(columns.available[row])
+
+    def all(self):
+        self.ensure_fresh()
+        columns = self._columns
+        return [columns.entry(row) for row in range(columns.size)]
+
+    def mark_available(self, book_id, available):
+        """Apply a local write immediately instead of waiting for the next refresh."""
+        columns = self._columns
+        if columns is not None:
+            row = columns.row_by_id.get(book_id)
+            if row is not None:
+                columns.available[row] = 1 if available else 0
+
+
+# One cache per branch in each worker process
+catalog = PerBranch(CatalogCache)
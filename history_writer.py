@@ -0,0 +1,267 @@
+"""
+Write-behind History logging.
+
+Borrow/return events are appended to a local journal file and queued in
+memory; a background thread writes them to the History table in multi-row
+inserts once HISTORY_BATCH_SIZE events are waiting or HISTORY_FLUSH_SECONDS
+have passed. The circulation request only pays for a file append.
+
+Journal lines are either events ({"seq": n, ...}) or checkpoints
+({"flushed": n}, meaning every event up to seq n is in the database). A
+batch that still fails after retries is kept and retried with the next
+one, and no checkpoint moves past it. When the app starts, events past the
+last checkpoint in any journal left behind by a dead worker are replayed
+into the database. Delivery is at-least-once: a crash between a batch
+commit and its checkpoint replays that batch. Each event remembers the branch it was
+recorded in and is written to that branch's database.
+"""
+
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: journals are not shared, no locking needed
+    fcntl = None
+
+from flask import current_app, g
+
+from app.models import db, History
+from app.branches import current_branch, default_branch
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+class HistoryWriter:
+    """Buffers History events and flushes them in batches from a thread."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = None
+        self._thread = None
+        self._atexit_registered = False
+        self._stop = threading.Event()
+        self._journal_lock = threading.Lock()
+        self._journal = None
+        self._seq = 0
+        self._unflushed = set()  # seqs journaled but not yet in the database
+        self._retry = []  # events from batches that failed every attempt
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("HISTORY_BATCH_SIZE", 500)
+        app.config.setdefault("HISTORY_FLUSH_SECONDS", 1.0)
+        app.config.setdefault("HISTORY_QUEUE_SIZE", 10000)
+        app.config.setdefault("HISTORY_JOURNAL_DIR", os.path.join(app.instance_path, "history-journal"))
+        # Set to True to fsync every event (survives power loss, not just a crash)
+        app.config.setdefault("HISTORY_JOURNAL_FSYNC", False)
+
+        self.app = app
+        self.batch_size = app.config["HISTORY_BATCH_SIZE"]
+        self.flush_seconds = app.config["HISTORY_FLUSH_SECONDS"]
+        self.fsync = app.config["HISTORY_JOURNAL_FSYNC"]
+        self.journal_dir = app.config["HISTORY_JOURNAL_DIR"]
+        self._queue = queue.Queue(maxsize=app.config["HISTORY_QUEUE_SIZE"])
+        app.extensions["history_writer"] = self
+
+    # ---------- Producer side ----------
+    def record(self, member_id, book_id, action, timestamp=None):
+        """Journal and enqueue one event. Blocks if the queue is full (backpressure)."""
+        self._ensure_started()
+        event = {
+            "member_id": member_id,
+            "book_id": book_id,
+            "action": action,
+            "timestamp": timestamp or datetime.utcnow(),
+            "branch": current_branch(),
+        }
+        with self._journal_lock:
+            self._seq += 1
+            event["seq"] = self._seq
+            self._unflushed.add(self._seq)
+            self._journal.write(_dump_event(event) + "\n")
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+        self._queue.put(event)
+
+    # ---------- Lifecycle ----------
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._journal_lock:
+            if self._thread is not None:
+                return
+            os.makedirs(self.journal_dir, exist_ok=True)
+            with self.app.app_context():
+                self.replay()
+            # Anything a previous run left unflushed was just replayed
+            self._unflushed.clear()
+            self._retry = []
+            path = os.path.join(self.journal_dir, f"history-{os.getpid()}.journal")
+            self._journal = open(path, "a", encoding="utf-8")
+            if fcntl:
+                fcntl.flock(self._journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def close(self):
+        """Flush everything still queued and stop the background thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._journal.close()
+        if not self._unflushed:
+            os.remove(self._journal.name)
+        self._journal = None
+
+    # ---------- Consumer side ----------
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                if self._retry:
+                    # Retried on their own: the queue fills up meanwhile and
+                    # record() blocks, instead of the backlog piling up here
+                    self._stop.wait(self.flush_seconds)
+                    self._flush(self._retry)
+                    if self._retry and self._stop.is_set():
+                        break  # shutting down; what's left stays in the journal
+                    continue
+                if self._stop.is_set() and self._queue.empty():
+                    break
+                batch = self._collect()
+                if batch:
+                    self._flush(batch)
+
+    def _collect(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0 or (self._stop.is_set() and self._queue.empty()):
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(timeout, 0.1)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _flush(self, batch):
+        pending = batch
+        for attempt in range(3):
+            if attempt:
+                time.sleep(2 ** (attempt - 1))
+            # Branches that committed are not sent again
+            pending = _insert_by_branch(pending, self.batch_size)
+            if not pending:
+                break
+        # Still failing: retried before anything else, replayed from the journal on restart
+        self._retry = pending
+        failed = {event["seq"] for event in pending}
+        self._checkpoint([event["seq"] for event in batch if event["seq"] not in failed])
+
+    def _checkpoint(self, seqs):
+        with self._journal_lock:
+            self._unflushed.difference_update(seqs)
+            if not self._unflushed:
+                # Everything journaled is in the database; start the file afresh
+                self._journal.truncate(0)
+                self._journal.seek(0)
+            else:
+                # Never past the oldest event that is not in the database yet
+                self._journal.write(json.dumps({"flushed": min(self._unflushed) - 1}) + "\n")
+            self._journal.flush()
+
+    # ---------- Recovery ----------
+    def replay(self):
+        """Insert unflushed events from journals whose worker is gone."""
+        replayed = 0
+        for path in glob.glob(os.path.join(self.journal_dir, "history-*.journal")):
+            with open(path, "r+", encoding="utf-8") as journal:
+                if fcntl:
+                    try:
+                        fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # a live worker still owns it
+                events = _pending_events(journal)
+                failed = _insert_by_branch(events, self.batch_size) if events else []
+                replayed += len(events) - len(failed)
+                if failed:
+                    # Keep only what is still missing for the next start
+                    journal.seek(0)
+                    journal.truncate()
+                    journal.writelines(_dump_event(event) + "\n" for event in failed)
+                    continue
+            os.remove(path)
+        if replayed:
+            self.app.logger.warning("Replayed %d History events from journal", replayed)
+        return replayed
+
+
+def _dump_event(event):
+    return json.dumps({**event, "timestamp": event["timestamp"].strftime(TIMESTAMP_FORMAT)})
+
+
+def _pending_events(journal):
+    events, flushed = [], 0
+    for line in journal:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            break  # torn write at the end of the file
+        if "flushed" in entry:
+            flushed = entry["flushed"]
+        else:
+            events.append(entry)
+    pending = [event for event in events if event["seq"] > flushed]
+    for event in pending:
+        event["timestamp"] = datetime.strptime(event["timestamp"], TIMESTAMP_FORMAT)
+    return pending
+
+
+def _insert_by_branch(events, batch_size):
+    """Multi-row inserts of events per branch, at most batch_size rows each.
+
+    Returns the events that were not written: for a branch whose insert
+    failed, the failed chunk and everything after it.
+    """
+    by_branch = defaultdict(list)
+    for event in events:
+        by_branch[event.get("branch") or default_branch()].append(event)
+    failed = []
+    for branch, branch_events in by_branch.items():
+        g.branch = branch
+        try:
+            for start in range(0, len(branch_events), batch_size):
+                chunk = branch_events[start:start + batch_size]
+                try:
+                    db.session.execute(History.__table__.insert(), [
+                        {key: event[key] for key in ("member_id", "book_id", "action", "timestamp")}
+                        for event in chunk
+                    ])
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.error("History insert of %d events into branch %s failed: %s",
+                                             len(chunk), branch, e)
+                    failed.extend(branch_events[start:])
+                    break
+        finally:
+            g.pop("branch", None)
+    return failed
+
+history_writer = HistoryWriter()
@@ -0,0 +1,143 @@
+"""
+In-memory trigram index for fuzzy member search.
+
+Prefix search is served by database indexes on Member.name/email/phone; this
+index covers typos and substring matches ("jon smth") that a B-tree can't.
+Each worker keeps its own copy, rebuilt in the background and topped up
+with new member ids on later lookups.
+"""
+
+import math
+import threading
+import time
+from array import array
+from collections import Counter
+
+from flask import current_app
+
+from app.branches import PerBranch, current_branch, run_in_branch
+
+REBUILD_SECONDS = 900
+# A candidate must share at least this fraction of the query's trigrams
+MIN_SIMILARITY = 0.5
+
+
+def trigrams(text):
+    """Padded, lower-cased trigrams of text."""
+    text = f"  {' '.join(text.lower().split())} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class MemberIndex:
+    """Trigram -> member id postings."""
+
+    def __init__(self):
+        self._postings = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, member_id, *fields):
+        text = " ".join(field for field in fields if field)
+        self._size += 1
+        for gram in trigrams(text):
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array("l")
+            postings.append(member_id)
+
+    def search(self, query, limit=10, max_postings=50000):
+        """Return up to limit member ids ranked by trigram similarity."""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        needed = math.ceil(len(query_grams) * MIN_SIMILARITY)
+
+        # Counter.update over arrays runs in C; trigrams shared by a large
+        # share of members (email domains, common name parts) say little
+        # about the match, so they're skipped and count as hits for everyone.
+        scores = Counter()
+        skipped = 0
+        for gram in query_grams:
+            postings = self._postings.get(gram, ())
+            if len(postings) > max_postings:
+                skipped += 1
+                continue
+            scores.update(postings)
+
+        threshold = needed - skipped
+        return [
+            member_id for member_id, shared in scores.most_common(limit)
+            if shared >= threshold
+        ]
+
+
+class MemberSearch:
+    """Per-worker MemberIndex kept in step with the Member table.
+
+    Full rebuilds run on a background thread and are swapped in when done;
+    searches keep using the previous index meanwhile (and find nothing until
+    the first build lands), so no request waits for a rebuild.
+    """
+
+    def __init__(self, rebuild_seconds=REBUILD_SECONDS):
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.Lock()
+        self._index = MemberIndex()
+        self._max_id = 0
+        self._built_at = None
+        self._builder = None
+
+    def refresh(self):
+        with self._lock:
+            stale = self._built_at is None or time.monotonic() - self._built_at >= self.rebuild_seconds
+            if stale and self._builder is None:
+                app = current_app._get_current_object()
+                self._builder = threading.Thread(
+                    target=run_in_branch, args=(app, current_branch(), self._rebuild),
+                    name="member-index-build", daemon=True,
+                )
+                self._builder.start()
+            if self._built_at is not None:
+                # Members added since the last load; a handful at most
+                self._max_id = _load(self._index, self._max_id)
+
+    def _rebuild(self):
+        # Full rebuild picks up renamed and deleted members
+        started = time.monotonic()
+        index = MemberIndex()
+        try:
+            max_id = _load(index, 0)
+            with self._lock:
+                self._index, self._max_id, self._built_at = index, max_id, started
+        finally:
+            self._builder = None
+
+    def join(self, timeout=None):
+        """Wait for a running rebuild to be swapped in."""
+        builder = self._builder
+        if builder is not None:
+            builder.join(timeout)
+
+    def search(self, query, limit=10):
+        self.refresh()
+        return self._index.search(query, limit=limit)
+
+
+def _load(index, since_id):
+    """Add members with id > since_id to index; returns the highest id seen."""
+    from app.models import db, Member
+
+    rows = db.session.query(Member.id, Member.name, Member.email) \
+        .filter(Member.id > since_id) \
+        .order_by(Member.id) \
+        .yield_per(10000)
+    for member_id, name, email in rows:
+        index.add(member_id, name, email)
+        since_id = member_id
+    return since_id
+
+
+# One index per branch in each worker process
+member_search = PerBranch(MemberSearch)
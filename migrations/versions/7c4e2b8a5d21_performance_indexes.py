@@ -0,0 +1,104 @@
+"""performance indexes and numeric money columns
+
+Adds indexes for the filters, joins and sorts used in routes/tasks.py,
+the Book.updated_at change timestamp used by the catalog cache, and stores
+fine/payment amounts as Numeric(10, 2) instead of Float. Columns and
+indexes that already exist are skipped, so any database created by
+db.create_all() can be stamped at 3a1f0c2d9b10 and upgraded.
+
+Revision ID: 7c4e2b8a5d21
+Revises: 3a1f0c2d9b10
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4e2b8a5d21'
+down_revision = '3a1f0c2d9b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases that db.create_all() built after models.py gained some of
+    # these (Book.updated_at, the Member indexes) already have them.
+    inspector = sa.inspect(op.get_bind())
+    existing = {
+        table: {index['name'] for index in inspector.get_indexes(table)}
+        for table in ('book', 'member', 'fine', 'payment', 'history')
+    }
+
+    def create_index(batch_op, table, name, columns):
+        if name not in existing[table]:
+            batch_op.create_index(name, columns, unique=False)
+
+    with op.batch_alter_table('book', schema=None) as batch_op:
+        if 'updated_at' not in {column['name'] for column in inspector.get_columns('book')}:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        create_index(batch_op, 'book', batch_op.f('ix_book_available'), ['available'])
+        create_index(batch_op, 'book', batch_op.f('ix_book_updated_at'), ['updated_at'])
+    # The app stamps updated_at in UTC; CURRENT_TIMESTAMP is the server's local time
+    op.execute(sa.text("UPDATE book SET updated_at = :now WHERE updated_at IS NULL")
+               .bindparams(now=datetime.utcnow()))
+
+    with op.batch_alter_table('member', schema=None) as batch_op:
+        create_index(batch_op, 'member', batch_op.f('ix_member_name'), ['name'])
+        create_index(batch_op, 'member', batch_op.f('ix_member_phone'), ['phone'])
+
+    with op.batch_alter_table('fine', schema=None) as batch_op:
+        batch_op.alter_column('amount',
+               existing_type=sa.Float(),
+               type_=sa.Numeric(precision=10, scale=2),
+               existing_nullable=False)
+        create_index(batch_op, 'fine', 'ix_fine_paid_member_amount', ['paid', 'member_id', 'amount'])
+        create_index(batch_op, 'fine', 'ix_fine_member_paid', ['member_id', 'paid'])
+
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.alter_column('amount',
+               existing_type=sa.Float(),
+               type_=sa.Numeric(precision=10, scale=2),
+               existing_nullable=False)
+        create_index(batch_op, 'payment', batch_op.f('ix_payment_fine_id'), ['fine_id'])
+
+    with op.batch_alter_table('history', schema=None) as batch_op:
+        create_index(batch_op, 'history', batch_op.f('ix_history_member_id'), ['member_id'])
+        create_index(batch_op, 'history', batch_op.f('ix_history_book_id'), ['book_id'])
+        create_index(batch_op, 'history', batch_op.f('ix_history_timestamp'), ['timestamp'])
+        create_index(batch_op, 'history', 'ix_history_action_timestamp', ['action', 'timestamp'])
+
+
+def downgrade():
+    with op.batch_alter_table('history', schema=None) as batch_op:
+        batch_op.drop_index('ix_history_action_timestamp')
+        batch_op.drop_index(batch_op.f('ix_history_timestamp'))
+        batch_op.drop_index(batch_op.f('ix_history_book_id'))
+        batch_op.drop_index(batch_op.f('ix_history_member_id'))
+
+    with op.batch_alter_table('payment', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payment_fine_id'))
+        batch_op.alter_column('amount',
+               existing_type=sa.Numeric(precision=10, scale=2),
+               type_=sa.Float(),
+               existing_nullable=False)
+
+    with op.batch_alter_table('fine', schema=None) as batch_op:
+        batch_op.drop_index('ix_fine_member_paid')
+        batch_op.drop_index('ix_fine_paid_member_amount')
+        batch_op.alter_column('amount',
+               existing_type=sa.Numeric(precision=10, scale=2),
+               type_=sa.Float(),
+               existing_nullable=False)
+
+    with op.batch_alter_table('member', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_member_phone'))
+        batch_op.drop_index(batch_op.f('ix_member_name'))
+
+    with op.batch_alter_table('book', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_book_updated_at'))
+        batch_op.drop_index(batch_op.f('ix_book_available'))
+        batch_op.drop_column('updated_at')
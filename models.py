@@ -17,9 +17,9 @@ class User(UserMixin, db.Model):
 
 class Member(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(120), nullable=False)
+    name = db.Column(db.String(120), nullable=False, index=True)
     email = db.Column(db.String(120), unique=True)
-    phone = db.Column(db.String(20))
+    phone = db.Column(db.String(20), index=True)
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
     fines = db.relationship("Fine", backref="member", lazy=True)
 
@@ -28,12 +28,19 @@ class Book(db.Model):
     title = db.Column(db.String(200), nullable=False)
     author = db.Column(db.String(120))
     isbn = db.Column(db.String(50), unique=True)
-    available = db.Column(db.Boolean, default=True)
+    available = db.Column(db.Boolean, default=True, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
 class Fine(db.Model):
+    __table_args__ = (
+        # Covers unpaid/paid totals and per-member balances without touching the table
+        db.Index("ix_fine_paid_member_amount", "paid", "member_id", "amount"),
+        db.Index("ix_fine_member_paid", "member_id", "paid"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     member_id = db.Column(db.Integer, db.ForeignKey("member.id"), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
     reason = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     paid = db.Column(db.Boolean, default=False)
@@ -41,15 +48,20 @@ class Fine(db.Model):
 
 class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    fine_id = db.Column(db.Integer, db.ForeignKey("fine.id"), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    fine_id = db.Column(db.Integer, db.ForeignKey("fine.id"), nullable=False, index=True)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
     paid_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class History(db.Model):
+    __table_args__ = (
+        # History export filters on action within a date range
+        db.Index("ix_history_action_timestamp", "action", "timestamp"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    member_id = db.Column(db.Integer, db.ForeignKey("member.id"), nullable=False)
-    book_id = db.Column(db.Integer, db.ForeignKey("book.id"), nullable=False)
+    member_id = db.Column(db.Integer, db.ForeignKey("member.id"), nullable=False, index=True)
+    book_id = db.Column(db.Integer, db.ForeignKey("book.id"), nullable=False, index=True)
     action = db.Column(db.String(30))  # borrow / return
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     member = db.relationship("Member")
     book = db.relationship("Book")
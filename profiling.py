@@ -0,0 +1,205 @@
+"""
+Opt-in per-request profiling for admins.
+
+When PROFILING_ENABLED is set, a request from an admin is profiled if it
+carries the PROFILING_HEADER header or falls within PROFILING_SAMPLE_RATE.
+For a profiled request we keep a cProfile run plus every SQL statement it
+issued (with timing and its EXPLAIN plan) in a ring buffer of the last
+PROFILING_KEEP profiles. They are served by routes/profiling.py.
+"""
+
+import cProfile
+import io
+import itertools
+import marshal
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import g, request, current_app, has_app_context
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class ProfileRecord:
+    __slots__ = ("id", "method", "path", "user", "status", "started_at",
+                 "duration_ms", "stats", "queries", "_lock")
+
+    def __init__(self, id, method, path, user, started_at):
+        self.id = id
+        self.method = method
+        self.path = path
+        self.user = user
+        self.started_at = started_at
+        self.status = None
+        self.duration_ms = None
+        self.stats = None
+        self.queries = []
+        # Branch fan-out threads record into the same profile
+        self._lock = threading.Lock()
+
+    def add_query(self, query):
+        with self._lock:
+            self.queries.append(query)
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "user": self.user,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+            "query_count": len(self.queries),
+            "sql_ms": round(sum(q["duration_ms"] for q in self.queries), 2),
+        }
+
+    def top_functions(self, limit=40):
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream)
+        stats.stats = marshal.loads(self.stats)
+        stats.get_top_level_stats()
+        stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+
+class RequestProfiler:
+    """Flask extension that profiles selected requests."""
+
+    def __init__(self, app=None):
+        self.profiles = deque(maxlen=20)
+        self._ids = itertools.count(1)
+        # cProfile can only have one active profiler at a time
+        self._active = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PROFILING_ENABLED", False)
+        app.config.setdefault("PROFILING_SAMPLE_RATE", 0.0)
+        app.config.setdefault("PROFILING_HEADER", "X-Profile")
+        app.config.setdefault("PROFILING_KEEP", 20)
+        app.config.setdefault("PROFILING_EXPLAIN", True)
+        self.profiles = deque(maxlen=app.config["PROFILING_KEEP"])
+        app.extensions["profiler"] = self
+
+        if app.config["PROFILING_ENABLED"]:
+            app.before_request(self._start)
+            app.after_request(self._finish)
+            app.teardown_request(self._release)
+            _listen_for_sql()
+
+    def get(self, profile_id):
+        for record in self.profiles:
+            if record.id == profile_id:
+                return record
+        return None
+
+    # ---------- Request hooks ----------
+    def _wanted(self):
+        if request.endpoint and request.endpoint.startswith("profiling."):
+            return False
+        if not (current_user.is_authenticated and current_user.is_admin):
+            return False
+        if request.headers.get(current_app.config["PROFILING_HEADER"]):
+            return True
+        return random.random() < current_app.config["PROFILING_SAMPLE_RATE"]
+
+    def _start(self):
+        if not self._wanted() or not self._active.acquire(blocking=False):
+            return
+        g.profile_record = ProfileRecord(
+            next(self._ids), request.method, request.full_path.rstrip("?"),
+            current_user.username, datetime.utcnow(),
+        )
+        g.profile_started = time.perf_counter()
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+    def _finish(self, response):
+        record = g.pop("profile_record", None)
+        if record is None:
+            return response
+        profiler = g.pop("profiler")
+        profiler.disable()
+        record.duration_ms = round((time.perf_counter() - g.pop("profile_started")) * 1000, 2)
+        record.status = response.status_code
+        profiler.create_stats()
+        record.stats = marshal.dumps(profiler.stats)
+        self._active.release()
+
+        if current_app.config["PROFILING_EXPLAIN"]:
+            _explain_all(record.queries)
+        self.profiles.append(record)
+        response.headers["X-Profile-Id"] = str(record.id)
+        return response
+
+    def _release(self, exc):
+        # after_request is skipped on unhandled errors; don't leave the lock held
+        if g.pop("profile_record", None) is not None:
+            g.pop("profiler").disable()
+            self._active.release()
+
+
+# ---------- SQL capture ----------
+_listening = False
+
+
+def _listen_for_sql():
+    global _listening
+    if _listening:
+        return
+    _listening = True
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_app_context() and "profile_record" in g:
+            conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not (has_app_context() and "profile_record" in g):
+            return
+        started = conn.info["profile_query_start"].pop()
+        g.profile_record.add_query({
+            "statement": statement,
+            "parameters": parameters,
+            "executemany": executemany,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "engine": conn.engine,
+            "plan": None,
+        })
+
+    @event.listens_for(Engine, "handle_error")
+    def handle_error(context):
+        # after_cursor_execute doesn't run for a failed statement
+        conn = context.connection
+        if conn is not None and has_app_context() and "profile_record" in g:
+            starts = conn.info.get("profile_query_start")
+            if starts:
+                starts.pop()
+
+
+def _explain_all(queries):
+    """Attach an EXPLAIN plan to every SELECT (runs after profiling stopped)."""
+    for query in queries:
+        engine = query.pop("engine")
+        parameters = query["parameters"]
+        query["parameters"] = repr(parameters)
+        if query["executemany"] or not query["statement"].lstrip().upper().startswith("SELECT"):
+            continue
+        prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            with engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + query["statement"], parameters).fetchall()
+            query["plan"] = [[str(value) for value in row] for row in rows]
+        except Exception as e:
+            query["plan"] = f"EXPLAIN failed: {e}"
+
+
+profiler = RequestProfiler()
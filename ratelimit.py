@@ -0,0 +1,238 @@
+"""
+In-process rate limiting with token buckets.
+
+Buckets live in worker memory by default. Setting RATELIMIT_STORAGE to a
+SQLite file path in the app config shares them across workers on the same
+host. Limits are checked in a decorator, before the view runs, so throttled
+requests never reach password hashing or the database.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+
+from flask import request, current_app
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated", "full_at")
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+        self.full_at = updated
+
+
+def _take(tokens, updated, now, rate, burst):
+    """Refill a bucket and try to take one token: (allowed, tokens, retry_after)."""
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+
+class MemoryStore:
+    """Per-worker bucket storage, bounded to max_keys buckets."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # least recently hit first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def hit(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune(now)
+                bucket = self._buckets[key] = TokenBucket(burst, now)
+            else:
+                self._buckets.move_to_end(key)
+            allowed, bucket.tokens, retry_after = _take(bucket.tokens, bucket.updated, now, rate, burst)
+            bucket.updated = now
+            # Each bucket remembers when its own rule refills it completely
+            bucket.full_at = now + (burst - bucket.tokens) / rate
+            return allowed, retry_after
+
+    def _prune(self, now):
+        # Buckets that have refilled completely carry no state worth keeping
+        for key in [k for k, b in self._buckets.items() if b.full_at <= now]:
+            del self._buckets[key]
+        # Still crowded: evict least recently hit buckets, leaving headroom so
+        # the next full scan is a tenth of max_keys new keys away
+        keep = self.max_keys - max(1, self.max_keys // 10)
+        while len(self._buckets) > keep:
+            self._buckets.popitem(last=False)
+
+
+class SQLiteStore:
+    """Bucket storage shared between worker processes through a SQLite file.
+
+    Rows are deleted once their bucket has refilled, at most every
+    sweep_seconds per worker.
+    """
+
+    def __init__(self, path, sweep_seconds=60):
+        self.path = path
+        self.sweep_seconds = sweep_seconds
+        self._next_sweep = 0.0
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, "
+            "full_at REAL NOT NULL DEFAULT 0)"
+        )
+        try:
+            # Files created before expiry; old rows count as refilled
+            conn.execute("ALTER TABLE rate_buckets ADD COLUMN full_at REAL NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass  # column already there
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_buckets_full_at ON rate_buckets (full_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+
+    def hit(self, key, rate, burst):
+        # Wall-clock time, since monotonic clocks aren't comparable across processes
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (burst, now)
+            allowed, tokens, retry_after = _take(tokens, updated, now, rate, burst)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (burst - tokens) / rate),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_seconds
+            self.sweep(now)
+        return allowed, retry_after
+
+    def sweep(self, now=None):
+        """Delete buckets that have refilled completely."""
+        self._connect().execute(
+            "DELETE FROM rate_buckets WHERE full_at <= ?", (time.time() if now is None else now,)
+        )
+
+
+class RateLimiter:
+    """Token-bucket limiter configured from the Flask app."""
+
+    def __init__(self, app=None):
+        self.store = MemoryStore()
+        self.enabled = True
+        self.throttled = Counter()
+        self.allowed = Counter()
+        self._metrics_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RATELIMIT_ENABLED", True)
+        app.config.setdefault("RATELIMIT_STORAGE", None)
+        self.enabled = app.config["RATELIMIT_ENABLED"]
+        if app.config["RATELIMIT_STORAGE"]:
+            self.store = SQLiteStore(app.config["RATELIMIT_STORAGE"])
+        app.extensions["ratelimit"] = self
+
+    def hit(self, name, key, rate, burst):
+        allowed, retry_after = self.store.hit(f"{name}:{key}", rate, burst)
+        with self._metrics_lock:
+            (self.allowed if allowed else self.throttled)[name] += 1
+        return allowed, retry_after
+
+    def stats(self):
+        with self._metrics_lock:
+            return {
+                "allowed": dict(self.allowed),
+                "throttled": dict(self.throttled),
+            }
+
+    def limit(self, *rules, methods=None, on_limit=None):
+        """Decorate a view with one or more rules (see by_ip / by_form / by_user).
+
+        on_limit(retry_after) builds the rejection response; defaults to a
+        plain 429. Only requests whose method is in methods are counted.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                if self.enabled and (methods is None or request.method in methods):
+                    for rule in rules:
+                        key = rule.key()
+                        if key is None:
+                            continue
+                        allowed, retry_after = self.hit(rule.name, key, rule.rate, rule.burst)
+                        if not allowed:
+                            current_app.logger.warning(
+                                "Rate limit %s exceeded for %s on %s", rule.name, key, request.path
+                            )
+                            response = on_limit(retry_after) if on_limit else \
+                                ("Too many requests, please slow down", 429)
+                            return _with_retry_after(current_app.make_response(response), retry_after)
+                return view(*args, **kwargs)
+            return wrapped
+        return decorator
+
+
+def _with_retry_after(response, retry_after):
+    response.status_code = 429
+    response.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+    return response
+
+
+class Rule:
+    """A bucket: `rate` tokens per second refilled up to `burst`, keyed by key()."""
+
+    def __init__(self, name, key, per_minute, burst=None):
+        self.name = name
+        self.key = key
+        self.rate = per_minute / 60.0
+        self.burst = burst or per_minute
+
+
+def by_ip(name, per_minute, burst=None):
+    return Rule(name, lambda: request.remote_addr or "unknown", per_minute, burst)
+
+
+def by_form(name, field, per_minute, burst=None):
+    """Keyed on a (normalised) form field, e.g. the username being tried."""
+    def key():
+        value = request.form.get(field, "").strip().lower()
+        return value or None
+    return Rule(name, key, per_minute, burst)
+
+
+def by_user(name, per_minute, burst=None):
+    from flask_login import current_user
+
+    def key():
+        return str(current_user.get_id()) if current_user.is_authenticated else None
+    return Rule(name, key, per_minute, burst)
+
+
+limiter = RateLimiter()
@@ -2,11 +2,22 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models import User
 from app import db
+from app.ratelimit import limiter, by_ip, by_form
 
 auth_bp = Blueprint("auth", __name__)
 
+def login_throttled(retry_after):
+    flash(f"Too many login attempts. Try again in {int(retry_after) + 1} seconds.", "danger")
+    return render_template("login.html")
+
 @auth_bp.route("/", methods=["GET", "POST"])
 @auth_bp.route("/login", methods=["GET", "POST"])
+@limiter.limit(
+    by_ip("login_ip", per_minute=20, burst=10),
+    by_form("login_username", "username", per_minute=5),
+    methods=("POST",),
+    on_limit=login_throttled,
+)
 def login():
     # If already logged in, go directly to dashboard
     if current_user.is_authenticated:
@@ -0,0 +1,39 @@
+from flask import Blueprint, jsonify, make_response
+from flask_login import login_required, current_user
+from app.profiling import profiler
+
+profiling_bp = Blueprint("profiling", __name__, url_prefix="/admin/profiles")
+
+@profiling_bp.before_request
+@login_required
+def require_admin():
+    if not current_user.is_admin:
+        return "Forbidden", 403
+
+@profiling_bp.route("")
+def list_profiles():
+    """Summaries of the most recent profiled requests, newest first."""
+    return jsonify([record.summary() for record in reversed(profiler.profiles)])
+
+@profiling_bp.route("/<int:profile_id>")
+def profile_detail(profile_id):
+    """Top functions by cumulative time plus every SQL statement with its EXPLAIN plan."""
+    record = profiler.get(profile_id)
+    if record is None:
+        return jsonify({"error": "Profile not found (it may have been evicted)"}), 404
+    return jsonify({
+        **record.summary(),
+        "top_functions": record.top_functions(),
+        "queries": record.queries,
+    })
+
+@profiling_bp.route("/<int:profile_id>/download")
+def download_profile(profile_id):
+    """Raw pstats file, loadable with pstats/snakeviz."""
+    record = profiler.get(profile_id)
+    if record is None:
+        return "Profile not found (it may have been evicted)", 404
+    response = make_response(record.stats)
+    response.headers['Content-Type'] = 'application/octet-stream'
+    response.headers['Content-Disposition'] = f'attachment; filename=profile_{record.id}.prof'
+    return response
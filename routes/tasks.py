@@ -1,8 +1,14 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, make_response
+from flask import Blueprint, render_template, request, redirect, url_for, flash, make_response, jsonify
 from flask_login import login_required, current_user
 # Assuming these models and db object are available from app.models
 from app.models import db, Book, Member, Fine, History
+from app.catalog_cache import catalog
+from app.member_index import member_search
+from app.ratelimit import limiter, by_ip, by_user
+from app.history_writer import history_writer
+from app.branches import fan_out
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -10,24 +16,67 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from datetime import datetime 
+from functools import partial
 
 task_bp = Blueprint("tasks", __name__) 
 
+# PDF exports are the most expensive requests we serve
+export_limit = limiter.limit(
+    by_ip("export_ip", per_minute=10, burst=5),
+    by_user("export_user", per_minute=6, burst=3),
+)
+
+# ---------------- Branch Metrics ----------------
+def dashboard_metrics():
+    """Dashboard counters for the current branch."""
+    return {
+        'total_books': Book.query.count(),
+        'total_members': Member.query.count(),
+        'total_fines_unpaid': db.session.query(func.sum(Fine.amount)).filter(Fine.paid == False).scalar() or 0,
+        'books_checked_out': Book.query.filter_by(available=False).count(),
+    }
+
+def report_metrics(history_limit):
+    """Report counters and recent history for the current branch."""
+    return {
+        'total_books': Book.query.count(),
+        'total_members': Member.query.count(),
+        'available_books': Book.query.filter_by(available=True).count(),
+        'total_fines': db.session.query(func.sum(Fine.amount)).scalar() or 0,
+        'paid_fines': db.session.query(func.sum(Fine.amount)).filter(Fine.paid == True).scalar() or 0,
+        # Eager-load so records stay usable after a fan-out thread closes its session
+        'recent_history': History.query.options(joinedload(History.member), joinedload(History.book))
+            .order_by(History.timestamp.desc()).limit(history_limit).all(),
+    }
+
+def metrics(fn, history_limit=None):
+    """Metrics for the current branch, or summed across all branches with ?scope=all.
+
+    history_limit is passed on to fn and also caps the merged recent_history.
+    """
+    kwargs = {} if history_limit is None else {'history_limit': history_limit}
+    if request.args.get('scope') != 'all':
+        return fn(**kwargs)
+    merged = {}
+    for result in fan_out(partial(fn, **kwargs)).values():
+        for key, value in result.items():
+            merged[key] = merged[key] + value if key in merged else value
+    if 'recent_history' in merged:
+        merged['recent_history'] = sorted(merged['recent_history'], key=lambda h: h.timestamp, reverse=True)[:history_limit]
+    return merged
+
 # ---------------- Dashboard (Endpoint: tasks.dashboard) ----------------
 @task_bp.route("/dashboard")
 @login_required
 def dashboard():
-    """Renders the main dashboard page."""
+    """Renders the main dashboard page (?scope=all aggregates every branch)."""
     try:
         # Fetch key metrics for the dashboard
-        total_books = Book.query.count()
-        total_members = Member.query.count()
-        
-        # Calculate total unpaid fines
-        total_fines_unpaid = db.session.query(func.sum(Fine.amount)).filter(Fine.paid == False).scalar() or 0
-        
-        # Determine number of books currently checked out (not available)
-        books_checked_out = Book.query.filter_by(available=False).count()
+        data = metrics(dashboard_metrics)
+        total_books = data['total_books']
+        total_members = data['total_members']
+        total_fines_unpaid = data['total_fines_unpaid']
+        books_checked_out = data['books_checked_out']
         
     except Exception as e:
         # Log error but use safe defaults if database queries fail
@@ -47,9 +96,65 @@ def dashboard():
 @login_required
 def books_page():
     """Renders the books management page (endpoint: tasks.books_page)."""
-    books = Book.query.all()
+    books = catalog.all()
     return render_template("books.html", books=books)
 
+@task_bp.route("/books/availability")
+@login_required
+def book_availability():
+    """Availability lookup by ISBN (barcode scan) or book id, served from the catalog cache."""
+    isbn = request.args.get('isbn', '').strip()
+    book_id = request.args.get('id', type=int)
+
+    if isbn:
+        entry = catalog.get_by_isbn(isbn)
+    elif book_id is not None:
+        entry = catalog.get(book_id)
+    else:
+        return jsonify({"error": "isbn or id is required"}), 400
+
+    if entry is None:
+        return jsonify({"error": "Book not found"}), 404
+    return jsonify(entry.to_dict())
+
+# ---------------- Circulation ----------------
+@task_bp.route("/books/<int:book_id>/borrow", methods=["POST"])
+@login_required
+def borrow_book(book_id):
+    """Check a book out to a member; the History row is written behind."""
+    member_id = request.form.get('member_id', type=int)
+    if member_id is None or db.session.get(Member, member_id) is None:
+        return jsonify({"error": "Valid member_id is required"}), 400
+
+    # Conditional update so two desks can't check out the same book
+    updated = Book.query.filter_by(id=book_id, available=True) \
+        .update({"available": False, "updated_at": datetime.utcnow()})
+    db.session.commit()
+    if not updated:
+        return jsonify({"error": "Book not found or already checked out"}), 409
+
+    catalog.mark_available(book_id, False)
+    history_writer.record(member_id, book_id, "borrow")
+    return jsonify({"book_id": book_id, "member_id": member_id, "action": "borrow"})
+
+@task_bp.route("/books/<int:book_id>/return", methods=["POST"])
+@login_required
+def return_book(book_id):
+    """Check a book back in; the History row is written behind."""
+    member_id = request.form.get('member_id', type=int)
+    if member_id is None or db.session.get(Member, member_id) is None:
+        return jsonify({"error": "Valid member_id is required"}), 400
+
+    updated = Book.query.filter_by(id=book_id, available=False) \
+        .update({"available": True, "updated_at": datetime.utcnow()})
+    db.session.commit()
+    if not updated:
+        return jsonify({"error": "Book not found or not checked out"}), 409
+
+    catalog.mark_available(book_id, True)
+    history_writer.record(member_id, book_id, "return")
+    return jsonify({"book_id": book_id, "member_id": member_id, "action": "return"})
+
 # ---------------- Member Management (Endpoint: tasks.members_page) ----------------
 @task_bp.route("/members")
 @login_required
@@ -58,13 +163,79 @@ def members_page():
     members = Member.query.all()
     return render_template("members.html", members=members)
 
+@task_bp.route("/members/lookup")
+@login_required
+def member_lookup():
+    """Prefix/fuzzy member search by id, name, email or phone, with unpaid fines."""
+    q = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    if not q:
+        return jsonify({"error": "q is required"}), 400
+
+    # Unpaid balance is aggregated in one query over the candidate members
+    unpaid_total = func.coalesce(func.sum(Fine.amount), 0).label('unpaid_total')
+    unpaid_count = func.count(Fine.id).label('unpaid_count')
+    base = db.session.query(Member, unpaid_total, unpaid_count) \
+        .outerjoin(Fine, (Fine.member_id == Member.id) & (Fine.paid == False)) \
+        .group_by(Member.id)
+
+    # Exact id, then a prefix range scan per column; each stops after `limit`
+    # index entries instead of aggregating every member that matches. Ranges
+    # follow the column collation: case-insensitive on MySQL, not on SQLite.
+    exact_id = int(q) if q.isdigit() else None
+    candidates = {exact_id} if exact_id is not None else set()
+    upper = q[:-1] + chr(min(ord(q[-1]) + 1, 0x10FFFF))
+    for column in (Member.name, Member.email, Member.phone):
+        candidates.update(member_id for (member_id,) in db.session.query(Member.id)
+                          .filter(column >= q, column < upper)
+                          .order_by(column).limit(limit))
+    rows = base.filter(Member.id.in_(candidates)).all() if candidates else []
+    # The member asked for by id, then members who actually owe something
+    rows = sorted(rows, key=lambda row: (row[0].id != exact_id, row[2] == 0, row[0].name))[:limit]
+    match = "prefix"
+
+    # Fall back to the in-memory trigram index for typos and partial names
+    if not rows:
+        ids = member_search.search(q, limit=limit)
+        if ids:
+            ranked = {member_id: rank for rank, member_id in enumerate(ids)}
+            rows = sorted(base.filter(Member.id.in_(ids)).all(), key=lambda row: ranked[row[0].id])
+        match = "fuzzy"
+
+    # The unpaid fines themselves, for the members that owe something
+    fines = {}
+    owing = [member.id for member, total, count in rows if count]
+    if owing:
+        for fine in Fine.query.filter(Fine.member_id.in_(owing), Fine.paid == False) \
+                .order_by(Fine.created_at, Fine.id):
+            fines.setdefault(fine.member_id, []).append({
+                "id": fine.id,
+                "amount": float(fine.amount),
+                "reason": fine.reason,
+                "created_at": fine.created_at.isoformat() if fine.created_at else None,
+            })
+
+    results = [{
+        "id": member.id,
+        "name": member.name,
+        "email": member.email,
+        "phone": member.phone,
+        "unpaid_total": float(total),
+        "unpaid_count": count,
+        "fines": fines.get(member.id, []),
+    } for member, total, count in rows]
+    return jsonify({"query": q, "match": match, "results": results})
+
 # ---------------- Fine Payment (Endpoint: tasks.fine_payment_page) ----------------
 @task_bp.route("/fine-payment")
 @login_required
 def fine_payment_page():
-    """Renders the fine payment page (endpoint: tasks.fine_payment_page)."""
-    fines = Fine.query.filter_by(paid=False).all()
-    return render_template("fine-payment.html", fines=fines)
+    """Renders the fine payment page (endpoint: tasks.fine_payment_page).
+
+    Members are searched on demand through tasks.member_lookup, so no fine
+    data is shipped with the page.
+    """
+    return render_template("fine-payment.html")
 
 # ---------------- History (Endpoint: tasks.history_page) ----------------
 @task_bp.route("/history")
@@ -78,21 +249,22 @@ def history_page():
 @task_bp.route("/reports")
 @login_required
 def reports_page():
-    """Renders the reports page (endpoint: tasks.reports_page)."""
+    """Renders the reports page (?scope=all aggregates every branch)."""
     try:
         # Calculate real metrics for reports
-        total_books = Book.query.count()
-        total_members = Member.query.count()
-        available_books = Book.query.filter_by(available=True).count()
+        data = metrics(report_metrics, history_limit=10)
+        total_books = data['total_books']
+        total_members = data['total_members']
+        available_books = data['available_books']
         borrowed_books = total_books - available_books
 
         # Calculate fines statistics
-        total_fines = db.session.query(func.sum(Fine.amount)).scalar() or 0
-        paid_fines = db.session.query(func.sum(Fine.amount)).filter(Fine.paid == True).scalar() or 0
+        total_fines = data['total_fines']
+        paid_fines = data['paid_fines']
         unpaid_fines = total_fines - paid_fines
 
         # Get recent history
-        recent_history = History.query.order_by(History.timestamp.desc()).limit(10).all()
+        recent_history = data['recent_history']
 
         # Calculate collection rate
         collection_rate = (paid_fines / total_fines * 100) if total_fines > 0 else 0
@@ -114,6 +286,7 @@ def reports_page():
 # ---------------- Export History PDF ----------------
 @task_bp.route("/export/history")
 @login_required
+@export_limit
 def export_history_pdf():
     """Generate and export history data as PDF."""
     try:
@@ -226,6 +399,7 @@ def export_history_pdf():
 # ---------------- Export Reports PDF ----------------
 @task_bp.route("/export/reports")
 @login_required
+@export_limit
 def export_reports_pdf():
     """Generate and export reports data as PDF."""
     try:
@@ -379,6 +553,15 @@ def export_reports_pdf():
         print(f"Error generating reports PDF: {e}")
         return f"Unable to generate PDF: {str(e)}", 500
 
+# ---------------- Rate Limit Metrics ----------------
+@task_bp.route("/admin/rate-limits")
+@login_required
+def rate_limit_stats():
+    """Allowed/throttled request counts per rate limit rule for this worker."""
+    if not current_user.is_admin:
+        return "Forbidden", 403
+    return jsonify(limiter.stats())
+
 @task_bp.route("/settings", methods=["GET", "POST"])
 @login_required
 def settings_page():
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for the ASGI adapter's per-route concurrency limits and load shedding.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.asgi import AsgiApp
+
+
+def make_app(release):
+    """WSGI app whose /export/ requests block until `release` is set."""
+    def wsgi_app(environ, start_response):
+        if environ["PATH_INFO"].startswith("/export/"):
+            release.wait(5)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"ok"]
+    return wsgi_app
+
+
+async def call(app, path):
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"]
+
+
+def test_excess_exports_are_shed_and_permits_are_returned():
+    async def scenario():
+        release = threading.Event()
+        app = AsgiApp(make_app(release), route_limits={"/export/": 1},
+                      max_waiting=1, wait_timeout=0.2)
+        limit = app.limit_for("/export/reports")
+
+        running = asyncio.ensure_future(call(app, "/export/reports"))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.ensure_future(call(app, "/export/reports"))
+        await asyncio.sleep(0.05)
+
+        # Slot taken and the wait queue full: rejected straight away
+        assert await call(app, "/export/reports") == 503
+        # Short requests are unaffected by the export backlog
+        assert await call(app, "/dashboard") == 200
+        # The queued export gives up after wait_timeout
+        assert await waiting == 503
+
+        release.set()
+        assert await running == 200
+        assert await call(app, "/export/reports") == 200
+        assert limit.rejected == 2
+        assert not limit.semaphore.locked()
+        app.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_timeout_racing_a_successful_acquire_keeps_the_permit_count():
+    async def scenario():
+        release = threading.Event()
+        release.set()
+        app = AsgiApp(make_app(release), route_limits={"/export/": 2},
+                      max_waiting=100, wait_timeout=0.001)
+        results = await asyncio.gather(*(call(app, "/export/history") for _ in range(200)))
+        assert set(results) <= {200, 503}
+        # Every permit handed out was given back
+        limit = app.limit_for("/export/history")
+        assert limit.semaphore._value == limit.limit
+        app.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_client_disconnecting_mid_body_is_not_dispatched():
+    async def scenario():
+        calls = []
+
+        def wsgi_app(environ, start_response):
+            calls.append(environ["PATH_INFO"])
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return [b"ok"]
+
+        app = AsgiApp(wsgi_app)
+        messages = iter([
+            {"type": "http.request", "body": b"username=ad", "more_body": True},
+            {"type": "http.disconnect"},
+        ])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/books/1/borrow", "query_string": b"", "headers": []}
+        await app(scope, receive, send)
+        assert calls == [] and sent == []
+        app.shutdown()
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
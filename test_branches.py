@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for per-branch database routing, branch selection and cross-branch metrics.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import g
+from sqlalchemy import inspect, text
+from app import create_app
+from app.branches import bind_key
+from app.models import db, Book, History, Member, User
+from app.routes.tasks import dashboard_metrics, metrics, report_metrics
+
+
+def make_app(**config):
+    tmp = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "main.db")}',
+        'LIBRARY_BRANCHES': {"north": f'sqlite:///{os.path.join(tmp, "north.db")}'},
+        'HISTORY_JOURNAL_DIR': os.path.join(tmp, "journal"),
+        'RATELIMIT_ENABLED': False,
+        **config,
+    })
+    with app.app_context():
+        # main: 2 books (1 out), north: 3 books (1 out)
+        for branch, books in (("main", 2), ("north", 3)):
+            g.branch = branch
+            db.session.add(Member(id=1, name=f"{branch} reader"))
+            for book_id in range(1, books + 1):
+                db.session.add(Book(id=book_id, title=f"{branch} {book_id}", available=book_id != 1))
+                db.session.add(History(member_id=1, book_id=book_id, action="borrow",
+                                       timestamp=datetime(2026, 1, book_id + (10 if branch == "north" else 0))))
+            db.session.commit()
+        g.pop("branch")
+    return app
+
+
+def count_rows(branch, table):
+    engine = db.engine if branch == "main" else db.engines[bind_key(branch)]
+    with engine.connect() as conn:
+        return conn.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar()
+
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+
+def test_branch_tables_route_to_the_branch_database_and_users_stay_central():
+    app = make_app()
+    with app.app_context():
+        assert count_rows("main", "book") == 2
+        assert count_rows("north", "book") == 3
+        # Staff accounts live only in the default database...
+        assert "user" not in inspect(db.engines[bind_key("north")]).get_table_names()
+        g.branch = "north"
+        # ...but are found from any branch
+        assert User.query.filter_by(username="admin").first() is not None
+        assert Book.query.count() == 3
+
+
+def test_branch_is_selected_from_query_header_or_session():
+    app = make_app()
+    with app.test_request_context('/dashboard?branch=north'):
+        app.preprocess_request()
+        assert g.branch == "north"
+    with app.test_request_context('/dashboard', headers={'X-Branch': 'north'}):
+        app.preprocess_request()
+        assert g.branch == "north"
+    with app.test_request_context('/dashboard?branch=nowhere'):
+        app.preprocess_request()
+        assert g.branch == "main"
+
+    client = app.test_client()
+    login(client)
+    client.get('/dashboard?branch=north')
+    with client.session_transaction() as session:
+        assert session["branch"] == "north"
+
+
+def test_scope_all_sums_counters_and_merges_history():
+    app = make_app()
+    with app.test_request_context('/reports?scope=all'):
+        app.preprocess_request()
+        dashboard = metrics(dashboard_metrics)
+        assert dashboard['total_books'] == 5
+        assert dashboard['books_checked_out'] == 2
+
+        report = metrics(report_metrics, history_limit=3)
+        timestamps = [h.timestamp.day for h in report['recent_history']]
+        assert timestamps == [13, 12, 11]
+
+    client = app.test_client()
+    login(client)
+    assert client.get('/reports?scope=all').status_code == 200
+
+
+def test_profiled_scope_all_request_captures_every_branch_query():
+    app = make_app(PROFILING_ENABLED=True)
+    client = app.test_client()
+    login(client)
+    response = client.get('/reports?scope=all', headers={'X-Profile': '1'})
+    profile = client.get(f"/admin/profiles/{response.headers['X-Profile-Id']}").get_json()
+    book_counts = [q for q in profile['queries'] if 'count(*)' in q['statement'].lower()
+                   and 'FROM book' in q['statement']]
+    # total_books and available_books in each of the two branches
+    assert len(book_counts) == 4
+    assert all(q['plan'] for q in profile['queries'] if q['statement'].lstrip().upper().startswith("SELECT"))
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
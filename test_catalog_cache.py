@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory catalog cache.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models import db, Book
+from app.catalog_cache import CatalogCache
+
+
+def make_app(books=20000):
+    path = os.path.join(tempfile.mkdtemp(), "catalog.db")
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        db.session.execute(Book.__table__.insert(), [
+            {"id": i, "title": f"Book {i}", "isbn": f"isbn-{i}", "available": True,
+             "updated_at": datetime(2026, 1, 1)}
+            for i in range(1, books + 1)
+        ])
+        db.session.commit()
+    return app
+
+
+def test_lookups_never_miss_during_full_reload():
+    app = make_app()
+    cache = CatalogCache(refresh_seconds=3600)
+    misses = []
+    stop = threading.Event()
+
+    def reader():
+        with app.app_context():
+            while not stop.is_set():
+                for isbn in ("isbn-1", "isbn-1000", "isbn-20000"):
+                    if cache.get_by_isbn(isbn) is None:
+                        misses.append(isbn)
+                if len(cache) != 20000:
+                    misses.append("size")
+
+    with app.app_context():
+        cache.refresh()
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for _ in range(10):
+            cache.refresh(full=True)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert misses == []
+
+
+def test_incremental_sync_picks_up_late_commits():
+    app = make_app(books=2)
+    cache = CatalogCache(refresh_seconds=0)
+    with app.app_context():
+        assert cache.get_by_isbn("isbn-1").available
+        # Bump the sync point, then commit a change stamped slightly earlier
+        Book.query.filter_by(id=2).update({"updated_at": datetime(2026, 1, 1, 0, 0, 30)})
+        db.session.commit()
+        cache.refresh()
+        Book.query.filter_by(id=1).update({
+            "available": False,
+            "updated_at": datetime(2026, 1, 1, 0, 0, 30) - timedelta(seconds=10),
+        })
+        db.session.commit()
+        cache.refresh()
+        assert cache.get_by_isbn("isbn-1").available is False
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Tests for the write-behind History writer: failed flushes and journal replay.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import g
+from app import create_app
+from app import history_writer as writer_module
+from app.branches import bind_key
+from app.history_writer import HistoryWriter
+from app.models import db, Book, Member, History
+
+
+def make_app(branches=(), **config):
+    tmp = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "history.db")}',
+        'LIBRARY_BRANCHES': {name: f'sqlite:///{os.path.join(tmp, name + ".db")}' for name in branches},
+        'HISTORY_JOURNAL_DIR': os.path.join(tmp, "journal"),
+        'HISTORY_FLUSH_SECONDS': 0.05,
+        **config,
+    })
+    with app.app_context():
+        for branch in [None, *branches]:
+            g.branch = branch
+            db.session.add_all([Member(id=1, name="Reader"), Book(id=1, title="Dune")])
+            db.session.commit()
+        g.pop("branch", None)
+    return app
+
+
+def no_backoff():
+    """Replace the writer's time module so retries don't sleep; returns the original."""
+    real_time = writer_module.time
+    writer_module.time = SimpleNamespace(monotonic=real_time.monotonic, sleep=lambda seconds: None)
+    return real_time
+
+
+class FlakyDatabase:
+    """Stands in for _insert_by_branch, failing every event while `down` is set."""
+
+    def __init__(self, insert):
+        self.insert = insert
+        self.down = False
+        self.failures = 0
+        self.largest = 0
+
+    def __call__(self, events, batch_size):
+        self.largest = max(self.largest, len(events))
+        if self.down:
+            self.failures += 1
+            return list(events)
+        return self.insert(events, batch_size)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_failed_batch_is_retried_and_replayed_not_lost():
+    app = make_app()
+    writer = HistoryWriter(app)
+    database = FlakyDatabase(writer_module._insert_by_branch)
+    writer_module._insert_by_branch = database
+    real_time = no_backoff()
+    try:
+        with app.app_context():
+            # A batch that fails every attempt...
+            database.down = True
+            writer.record(1, 1, "borrow")
+            wait_for(lambda: database.failures >= 3)
+            # ...is written once the database is back
+            database.down = False
+            writer.record(1, 1, "return")
+            wait_for(lambda: History.query.count() == 2)
+
+            # Database down again, then the worker dies without flushing
+            database.down = True
+            writer.record(1, 1, "borrow")
+            wait_for(lambda: database.failures >= 6)
+            writer._stop.set()
+            writer._thread.join()
+            writer._journal.close()  # releases the journal lock, as process exit would
+            writer._thread = None
+
+            # The next worker replays only the unflushed event
+            database.down = False
+            assert HistoryWriter(app).replay() == 1
+            assert [row.action for row in History.query.order_by(History.id)] == \
+                ["borrow", "return", "borrow"]
+            assert os.listdir(app.config["HISTORY_JOURNAL_DIR"]) == []
+    finally:
+        writer_module._insert_by_branch = database.insert
+        writer_module.time = real_time
+
+
+def test_queue_backpressure_holds_while_the_database_is_down():
+    app = make_app(HISTORY_QUEUE_SIZE=50, HISTORY_BATCH_SIZE=20)
+    writer = HistoryWriter(app)
+    database = FlakyDatabase(writer_module._insert_by_branch)
+    writer_module._insert_by_branch = database
+    real_time = no_backoff()
+    recorded = []
+
+    def producer():
+        with app.app_context():
+            for _ in range(2000):
+                writer.record(1, 1, "borrow")
+                recorded.append(1)
+
+    try:
+        database.down = True
+        thread = threading.Thread(target=producer, daemon=True)
+        thread.start()
+        wait_for(lambda: database.failures >= 6)
+        # One failed batch held back, the queue full, and record() blocked
+        assert len(writer._retry) <= 20
+        assert len(recorded) <= 50 + 20 + 1
+
+        database.down = False
+        thread.join(10)
+        with app.app_context():
+            wait_for(lambda: History.query.count() == 2000, timeout=10)
+            writer.close()
+        assert database.largest <= 20
+    finally:
+        writer_module._insert_by_branch = database.insert
+        writer_module.time = real_time
+
+
+def test_retry_only_resends_branches_that_failed():
+    app = make_app(branches=["north"])
+    writer = HistoryWriter(app)
+    real_time = no_backoff()
+    try:
+        with app.app_context():
+            north = db.engines[bind_key("north")]
+            History.__table__.drop(north)  # north's inserts fail until it is back
+            writer.record(1, 1, "borrow")
+            g.branch = "north"
+            writer.record(1, 1, "borrow")
+            g.pop("branch")
+            wait_for(lambda: writer._retry)
+            History.__table__.create(north)
+            wait_for(lambda: not writer._retry and not writer._unflushed)
+            writer.close()
+
+            assert History.query.count() == 1
+            g.branch = "north"
+            assert History.query.count() == 1
+    finally:
+        writer_module.time = real_time
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
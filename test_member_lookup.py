@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for /members/lookup: ranking, prefix vs fuzzy matching and unpaid fines.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.member_index import member_search
+from app.models import db, Fine, Member
+
+
+def make_app():
+    tmp = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "lookup.db")}',
+        'HISTORY_JOURNAL_DIR': os.path.join(tmp, "journal"),
+        'RATELIMIT_ENABLED': False,
+    })
+    with app.app_context():
+        db.session.add_all([
+            Member(id=1, name="Alice Archer", email="alice@example.com"),
+            Member(id=2, name="Alan Abbott", email="alan@example.com"),
+            Member(id=3, name="Alba Avery", email="alba@example.com"),
+            Member(id=12, name="Zed Zimmer", email="zed@example.com"),
+            Member(id=20, name="2nd Avenue Book Club", email="club@example.com"),
+            Fine(member_id=3, amount=2.50, reason="Late: Dune", created_at=datetime(2026, 1, 2)),
+            Fine(member_id=3, amount=4.00, reason="Late: Emma", created_at=datetime(2026, 1, 1)),
+            Fine(member_id=3, amount=9.00, reason="Lost: Ulysses", paid=True),
+            Fine(member_id=12, amount=1.00, reason="Late: Kim"),
+            Fine(member_id=20, amount=3.00, reason="Late: Beloved"),
+        ])
+        db.session.commit()
+    # The index is per worker process; don't search one built by another test's app
+    member_search._instances.clear()
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    return app, client
+
+
+def lookup(client, q, **params):
+    return client.get('/members/lookup', query_string={'q': q, **params}).get_json()
+
+
+def test_prefix_match_ranks_members_who_owe_first_and_returns_their_fines():
+    app, client = make_app()
+    data = lookup(client, "Al")
+    assert data['match'] == "prefix"
+    assert [m['id'] for m in data['results']] == [3, 2, 1]
+
+    alba = data['results'][0]
+    assert alba['unpaid_total'] == 6.5
+    assert alba['unpaid_count'] == 2
+    # Unpaid only, oldest first
+    assert [(f['reason'], f['amount']) for f in alba['fines']] == [("Late: Emma", 4.0), ("Late: Dune", 2.5)]
+    assert data['results'][1]['fines'] == [] and data['results'][1]['unpaid_total'] == 0
+
+
+def test_exact_id_comes_before_members_who_owe():
+    app, client = make_app()
+    # "2" is member 2 by id, and a name prefix of member 20, who owes
+    assert [m['id'] for m in lookup(client, "2")['results']] == [2, 20]
+
+
+def test_typo_falls_back_to_the_fuzzy_index():
+    app, client = make_app()
+    with app.test_request_context():
+        member_search.refresh()
+        member_search.join()
+    data = lookup(client, "Zimer")
+    assert data['match'] == "fuzzy"
+    assert [m['id'] for m in data['results']] == [12]
+    assert data['results'][0]['fines'][0]['reason'] == "Late: Kim"
+
+
+def test_limit_is_clamped():
+    app, client = make_app()
+    assert len(lookup(client, "Al", limit=0)['results']) == 1
+    assert len(lookup(client, "Al", limit=-5)['results']) == 1
+    assert len(lookup(client, "Al", limit=2)['results']) == 2
+    assert client.get('/members/lookup').status_code == 400
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Check that fresh and pre-migration databases both reach the latest revision.
+"""
+
+import os
+import sys
+import tempfile
+
+import click
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alembic.migration import MigrationContext
+from flask_migrate import downgrade, stamp, upgrade
+from sqlalchemy import create_engine, inspect, text
+from app import create_app
+from app.models import db
+
+HEAD = "7c4e2b8a5d21"
+
+
+def database_uri():
+    return f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'migrations.db')}"
+
+
+def current_revision():
+    with db.engine.connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def test_fresh_database_is_stamped_and_upgrades_cleanly():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_uri()})
+    with app.app_context():
+        assert current_revision() == HEAD
+        upgrade()
+        assert current_revision() == HEAD
+
+
+def startup_error(uri):
+    try:
+        create_app({'SQLALCHEMY_DATABASE_URI': uri})
+    except RuntimeError as e:
+        return str(e)
+    return None
+
+
+def create_app_from_cli(uri):
+    # As `flask db ...` would load it
+    with click.Context(click.Command("flask")):
+        return create_app({'SQLALCHEMY_DATABASE_URI': uri})
+
+
+def test_create_all_database_with_new_indexes_can_be_stamped_and_upgraded():
+    # Built by create_all() from current models, before migrations existed
+    uri = database_uri()
+    engine = create_engine(uri)
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    assert "no migration history" in startup_error(uri)
+
+    app = create_app_from_cli(uri)
+    assert app.test_client().get('/login').status_code == 503
+    with app.app_context():
+        assert current_revision() is None
+        stamp(revision="3a1f0c2d9b10")
+        upgrade()
+        assert current_revision() == HEAD
+        assert "ix_member_name" in {index["name"] for index in inspect(db.engine).get_indexes("member")}
+
+    assert create_app({'SQLALCHEMY_DATABASE_URI': uri}).test_client().get('/login').status_code == 200
+
+
+def test_app_refuses_a_database_behind_the_latest_migration():
+    uri = database_uri()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri})
+    with app.app_context():
+        downgrade(revision="3a1f0c2d9b10")
+
+    assert "flask db upgrade" in startup_error(uri)
+    with create_app_from_cli(uri).app_context():
+        upgrade()
+        assert current_revision() == HEAD
+
+
+def test_original_schema_can_be_stamped_and_upgraded():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_uri()})
+    with app.app_context():
+        # Back to the schema create_all() produced before migrations, untracked
+        downgrade(revision="3a1f0c2d9b10")
+        db.session.execute(text("DROP TABLE alembic_version"))
+        db.session.commit()
+        assert "updated_at" not in {column["name"] for column in inspect(db.engine).get_columns("book")}
+        stamp(revision="3a1f0c2d9b10")
+        upgrade()
+        assert current_revision() == HEAD
+        assert "updated_at" in {column["name"] for column in inspect(db.engine).get_columns("book")}
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
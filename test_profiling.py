@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for opt-in request profiling and the /admin/profiles endpoints.
+"""
+
+import os
+import pstats
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app import create_app
+from app.models import db, User
+from app.profiling import profiler
+
+
+def make_app(**config):
+    tmp = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "profiling.db")}',
+        'HISTORY_JOURNAL_DIR': os.path.join(tmp, "journal"),
+        'RATELIMIT_ENABLED': False,
+        'PROFILING_ENABLED': True,
+        **config,
+    })
+
+    def broken():
+        db.session.execute(text("SELECT 1"))
+        raise RuntimeError("view failed")
+
+    def bad_sql():
+        conn = db.session.connection()
+        try:
+            conn.execute(text("SELECT * FROM no_such_table"))
+        except Exception:
+            pass
+        # Start times left on the pooled connection by the failed statement
+        left_behind = len(conn.info.get("profile_query_start", []))
+        db.session.rollback()
+        return str(left_behind)
+
+    app.add_url_rule("/test/broken", "broken", broken)
+    app.add_url_rule("/test/bad-sql", "bad_sql", bad_sql)
+    with app.app_context():
+        staff = User(username="staff", is_admin=False)
+        staff.set_password("staff123")
+        db.session.add(staff)
+        db.session.commit()
+    return app
+
+
+def login(app, username="admin", password="admin123"):
+    client = app.test_client()
+    client.post('/login', data={'username': username, 'password': password})
+    return client
+
+
+def profiled(client, path='/dashboard'):
+    return client.get(path, headers={'X-Profile': '1'})
+
+
+def test_only_admin_requests_with_the_header_are_profiled():
+    app = make_app()
+    assert 'X-Profile-Id' not in profiled(login(app, "staff", "staff123")).headers
+    assert 'X-Profile-Id' not in login(app).get('/dashboard').headers
+    assert 'X-Profile-Id' in profiled(login(app)).headers
+
+
+def test_profile_lists_selects_with_plans_and_downloads_as_pstats():
+    app = make_app()
+    client = login(app)
+    profile_id = profiled(client).headers['X-Profile-Id']
+
+    detail = client.get(f'/admin/profiles/{profile_id}').get_json()
+    selects = [q for q in detail['queries'] if q['statement'].lstrip().upper().startswith("SELECT")]
+    assert selects and all(q['plan'] is not None for q in selects)
+    assert detail['query_count'] == len(detail['queries'])
+
+    response = client.get(f'/admin/profiles/{profile_id}/download')
+    path = os.path.join(tempfile.mkdtemp(), "profile.prof")
+    with open(path, "wb") as f:
+        f.write(response.data)
+    assert pstats.Stats(path).total_calls > 0
+
+
+def test_ring_buffer_keeps_the_last_profiling_keep_profiles():
+    app = make_app(PROFILING_KEEP=2)
+    client = login(app)
+    ids = [profiled(client).headers['X-Profile-Id'] for _ in range(3)]
+    assert client.get(f'/admin/profiles/{ids[0]}').status_code == 404
+    assert [p['id'] for p in client.get('/admin/profiles').get_json()] == [int(ids[2]), int(ids[1])]
+
+
+def test_failing_view_releases_the_profiler():
+    app = make_app(PROPAGATE_EXCEPTIONS=True)
+    client = login(app)
+    try:
+        profiled(client, '/test/broken')
+    except RuntimeError:
+        pass
+    assert not profiler._active.locked()
+    assert 'X-Profile-Id' in profiled(client).headers
+
+
+def test_failed_statement_does_not_leave_a_start_time_behind():
+    app = make_app()
+    client = login(app)
+    response = profiled(client, '/test/bad-sql')
+    assert 'X-Profile-Id' in response.headers
+    assert response.data == b"0"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
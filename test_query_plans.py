@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Check that the hot queries in routes/tasks.py are served by indexes.
+
+Runs EXPLAIN QUERY PLAN against a throwaway SQLite database built by the
+migrations, so it needs no MySQL server.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from flask_migrate import upgrade
+from app import create_app
+from app.models import db, Book, Member, Fine, History
+
+
+def make_app():
+    path = os.path.join(tempfile.mkdtemp(), "plans.db")
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        # A no-op on a fresh database, which create_app() stamps at head
+        upgrade()
+    return app
+
+
+def query_plan(query):
+    """EXPLAIN QUERY PLAN output for an ORM query, as one string."""
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+def assert_uses_index(query, index_name):
+    plan = query_plan(query)
+    assert index_name in plan, f"expected {index_name} in plan:\n{plan}"
+
+
+def test_unpaid_fine_total_uses_covering_index():
+    with make_app().app_context():
+        query = db.session.query(func.sum(Fine.amount)).filter(Fine.paid == False)
+        assert_uses_index(query, "COVERING INDEX ix_fine_paid_member_amount")
+
+
+def test_checked_out_count_uses_available_index():
+    with make_app().app_context():
+        assert_uses_index(Book.query.filter_by(available=False), "ix_book_available")
+
+
+def test_recent_history_uses_timestamp_index():
+    with make_app().app_context():
+        query = History.query.order_by(History.timestamp.desc()).limit(10)
+        assert_uses_index(query, "ix_history_timestamp")
+
+
+def test_history_export_filter_uses_action_timestamp_index():
+    with make_app().app_context():
+        query = History.query.filter(
+            History.action == "borrow",
+            History.timestamp >= datetime(2025, 1, 1),
+        ).order_by(History.timestamp.desc())
+        assert_uses_index(query, "ix_history_action_timestamp")
+
+
+def test_top_defaulters_use_fine_index():
+    with make_app().app_context():
+        query = db.session.query(Member.name, func.sum(Fine.amount)) \
+            .join(Fine).filter(Fine.paid == False) \
+            .group_by(Member.id, Member.name)
+        assert_uses_index(query, "ix_fine_paid_member_amount")
+
+
+def test_member_prefix_lookup_uses_name_index():
+    with make_app().app_context():
+        query = db.session.query(Member.id) \
+            .filter(Member.name >= "jan", Member.name < "jao") \
+            .order_by(Member.name).limit(10)
+        plan = query_plan(query)
+        assert "ix_member_name" in plan and "TEMP B-TREE" not in plan, plan
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
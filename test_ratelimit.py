@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for token-bucket storage: pruning, eviction and expiry.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ratelimit import MemoryStore, SQLiteStore
+
+
+def test_prune_uses_each_buckets_own_rule():
+    store = MemoryStore(max_keys=4)
+    # A slow rule (1 token/min) that was just used up...
+    assert store.hit("login:alice", 1 / 60, 1) == (True, 0.0)
+    for i in range(3):
+        store.hit(f"api:{i}", 1000, 1)
+    time.sleep(0.05)
+    # ...must not be pruned just because a fast rule refills in a few ms
+    store.hit("api:new", 1000, 1)
+    assert len(store) == 2
+    allowed, retry_after = store.hit("login:alice", 1 / 60, 1)
+    assert not allowed and retry_after > 50
+
+
+def test_store_stays_bounded_when_nothing_has_refilled():
+    store = MemoryStore(max_keys=100)
+    store.hit("hot", 1 / 60, 1)
+    for i in range(1000):
+        store.hit(f"ip:{i}", 1 / 60, 1)
+        if i % 50 == 0:
+            store.hit("hot", 1 / 60, 1)  # recently used buckets survive eviction
+    assert len(store) <= 100
+    assert not store.hit("hot", 1 / 60, 1)[0]
+
+
+def test_sqlite_store_deletes_refilled_buckets():
+    store = SQLiteStore(os.path.join(tempfile.mkdtemp(), "buckets.db"))
+    store.hit("fast", 1000, 1)
+    store.hit("slow", 1 / 60, 1)
+    time.sleep(0.01)
+    store.sweep()
+    assert len(store) == 1
+    assert not store.hit("slow", 1 / 60, 1)[0]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")